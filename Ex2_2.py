@@ -1,70 +1,62 @@
 # I got help from ChatGPT
 
 import numpy as np
-from scipy.integrate import solve_ivp
+from scipy.signal import StateSpace, lsim
+import matplotlib
+matplotlib.use('Agg')  # render without a display and write the figure to Ex2_2.png
 import matplotlib.pyplot as plt
 
 # Parameters
 R = 10  # Resistance in ohms
 L = 20  # Inductance in henrys
 C = 0.05  # Capacitance in farads
+V0 = 20  # Amplitude of the voltage source in volts
+w = 20  # Angular frequency of the voltage source in rad/s
 
-def v(t):
+def circuit_system():
     """
-    Defines the voltage source function in the circuit.
+    Represents the system of differential equations for an RLC circuit as a linear time-invariant state-space model.
 
-    This function models the time-varying voltage source in the circuit, which in this case is a sinusoidal function.
-
-    Parameters:
-    - t (float): Time variable, representing the point in time at which the voltage is calculated.
+    The circuit is described by two coupled first-order differential equations for the current through the inductor
+    (i1) and the voltage across the capacitor (vC), driven by the sinusoidal source v(t) = V0*sin(w*t):
+        di1/dt = (v(t) - i1*R - vC) / L
+        dvC/dt = i1 / C
+    The source itself obeys ds/dt = w*c, dc/dt = -w*s with s = sin(w*t) and c = cos(w*t), so adding s and c to the
+    state gives an unforced linear system dY/dt = A*Y. On an evenly spaced grid its solution is
+    Y(t+dt) = expm(A*dt)*Y(t), so every step of the propagation lands on an output point and is exact, with no input
+    interpolation or adaptive step control.
 
     Returns:
-    - float: The voltage at time t.
-    """
-    return 20 * np.sin(20 * t)
-
-def circuit_equations(t, Y):
+    - StateSpace: The model with state [i1, vC, s, c] and output [i1, vC].
     """
-    Represents the system of differential equations for an RLC circuit.
+    A = [[-R / L, -1 / L, V0 / L, 0],
+         [1 / C, 0, 0, 0],
+         [0, 0, 0, w],
+         [0, 0, -w, 0]]
+    B = np.zeros((4, 1))  # no external input, the source is part of the state
+    return StateSpace(A, B, np.eye(4)[:2], np.zeros((2, 1)))
 
-    This function models the behavior of an RLC circuit using two coupled first-order differential equations,
-    describing the time evolution of the current through the inductor and the voltage across the capacitor.
-
-    Parameters:
-    - t (float): Time variable, the point in time at which the system is evaluated.
-    - Y (list of floats): A list containing the current state of the system, where Y[0] is the current through the
-      inductor (i1) and Y[1] is the voltage across the capacitor (vC).
-
-    Returns:
-    - list of floats: The derivatives of i1 and vC as a list, where the first element is di1/dt and the second is dvC/dt.
-    """
-    i1, vC = Y
-    di1_dt = (v(t) - i1*R - vC) / L  # Differential equation for the inductor's current
-    dvC_dt = i1 / C  # Differential equation for the capacitor's voltage
-    return [di1_dt, dvC_dt]
-
-# Initial conditions: i1(0) = 0, vC(0) = 0
-Y0 = [0, 0]
+# Initial conditions: i1(0) = 0, vC(0) = 0, and the source starts at sin(0) = 0, cos(0) = 1
+Y0 = [0, 0, 0, 1]
 
 # Time span to solve the differential equations over 10 seconds
 t_span = (0, 10)
 t_eval = np.linspace(*t_span, 1000)
 
 # Solve the system of differential equations
-sol = solve_ivp(circuit_equations, t_span, Y0, t_eval=t_eval)
+t, Y, _ = lsim(circuit_system(), None, t_eval, X0=Y0)
 
 # Plot the results
-plt.figure(figsize=(14, 7))
-
-# Current i1(t) and i2(t)
-plt.plot(sol.t, sol.y[0], label='i1(t) = i2(t) [A]', linestyle='-')
+fig = plt.figure(figsize=(14, 7))
 
-# Voltage across capacitor vC(t)
-plt.plot(sol.t, sol.y[1], label='vC(t) [V]', linestyle=':')
+# Y has one column per output, so a single plot call gives one line each for i1 and vC
+i1_line, vC_line = plt.plot(t, Y)
+i1_line.set(label='i1(t) = i2(t) [A]', linestyle='-')  # Current i1(t) and i2(t)
+vC_line.set(label='vC(t) [V]', linestyle=':')  # Voltage across capacitor vC(t)
 
 plt.title('Currents and Voltage in RLC Circuit')
 plt.xlabel('Time (s)')
 plt.ylabel('Current (A) / Voltage (V)')
 plt.legend()
 plt.grid(True)
-plt.show()
+fig.savefig('Ex2_2.png')
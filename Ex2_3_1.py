@@ -1,8 +1,8 @@
 # region imports
 import numpy as np
 import math
+import sys
 from scipy.optimize import fsolve
-import random as rnd
 
 
 # endregion
@@ -183,7 +183,9 @@ class Loop():
 
 
 class Pipe():
-    def __init__(self, Start='A', End='B', L=100, D=200, r=0.00025, fluid=Fluid(), SI=True):
+    g = 9.81  # m/s^2
+
+    def __init__(self, Start='A', End='B', L=100, D=200, r=0.00025, fluid=Fluid(), SI=True, rng=None):
         '''
         Defines a generic pipe with orientation from lowest letter to highest, alphabetically.
         :param Start: the start node (string)
@@ -193,6 +195,7 @@ class Pipe():
         :param r: the pipe roughness in m  (float)
         :param fluid:  a Fluid object (typically water)
         :param SI: if SI==False, need to convert len, roughness from ft to m and dia from in to m
+        :param rng: a numpy random Generator for the friction factor in transitional flow (a new one if None)
         '''
         # from arguments given in constructor
 
@@ -201,11 +204,16 @@ class Pipe():
         self.length = L if SI else UC.ft_to_m * L
         self.rough = r if SI else UC.ft_to_m * r
         self.fluid = fluid  # the fluid in the pipe
+        self.rng = rng if rng is not None else np.random.default_rng()
 
         # other calculated properties
         self.d = D / 1000.0 if SI else UC.in_to_m * D  # diameter in m
         self.relrough = self.rough / self.d  # $JES MISSING CODE #calculate relative roughness for easy use later
         self.A = math.pi * (self.d / 2) ** 2  # $JES MISSING CODE #calculate pipe cross sectional area for easy use later
+        # constant factors of V(), Re() and frictionHeadLoss(), computed once here rather than on every evaluation
+        self.velFactor = 1 / (1000 * self.A)  # (m/s) per (L/s)
+        self.reFactor = self.fluid.rho * self.d / self.fluid.mu  # Re per (m/s)
+        self.hlFactor = (self.length / self.d) * self.fluid.rho / (2 * self.g)  # head loss per f*V^2
         self.Q = 10  # working in units of L/s, just an initial guess
         self.vel = self.V()  # calculate the initial velocity of the fluid
         self.reynolds = self.Re()  # calculate the initial reynolds number
@@ -216,7 +224,7 @@ class Pipe():
         Calculate average velocity in the pipe for volumetric flow self.Q
         :return:the average velocity in m/s
         '''
-        self.vel = abs((self.Q/1000) / self.A)
+        self.vel = abs(self.Q * self.velFactor)
         return self.vel
 
     def Re(self):
@@ -224,7 +232,7 @@ class Pipe():
         Calculate the reynolds number under current conditions.
         :return:
         '''
-        self.reynolds = (self.fluid.rho * self.V() * self.d) / self.fluid.mu  # $JES MISSING CODE # Re=rho*V*d/mu, be sure to use V() so velocity is updated.
+        self.reynolds = self.V() * self.reFactor  # Re=rho*V*d/mu, be sure to use V() so velocity is updated.
         return self.reynolds
 
     def FrictionFactor(self):
@@ -233,40 +241,72 @@ class Pipe():
         notion of laminar, turbulent and transitional flow.
         :return: the (Darcy) friction factor
         """
-        # update the Reynolds number and make a local variable Re
-        Re = self.Re()
-        rr = self.relrough
-
-        # to be used for turbulent flow
-        def CB():
-            # note:  in numpy log is for natural log.  log10 is log base 10.
-            cb = lambda f: 1 / (f ** 0.5) + 2.0 * np.log10(rr / 3.7 + 2.51 / (Re * f ** 0.5))
-            result = fsolve(cb, (0.01))
-            val = cb(result[0])
-            return result[0]
-
-        # to be used for laminar flow
-        def lam():
-            return 64 / Re
-
-        if Re >= 4000:  # true for turbulent flow
-            return CB()
-        if Re <= 2000:  # true for laminar flow
-            return lam()
+        return self.frictionFactors(self.Re(), self.relrough, self.rng)
+
+    @staticmethod
+    def frictionFactors(Re, rr, rng):
+        '''
+        Calculates the (Darcy) friction factor for laminar, turbulent and transitional flow.  Works on a single
+        pipe or on arrays of Re and rr for every pipe at once.
+        :param Re: Reynolds number(s)
+        :param rr: relative roughness(es)
+        :param rng: numpy random generator used for the transitional draw
+        :return: the friction factor(s), a float for scalar input
+        '''
+        scalar = np.ndim(Re) == 0
+        # keep Re away from zero for stagnant pipes
+        Re = np.maximum(np.atleast_1d(np.asarray(Re, dtype=float)), 1e-12)
+        CBff = Pipe.colebrook(Re, rr)  # turbulent flow
+        Lamff = 64 / Re  # laminar flow
+        ff = np.where(Re <= 2000, Lamff, CBff)
 
         # transition flow is ambiguous, so use normal variate weighted by Re
-        CBff = CB()
-        Lamff = lam()
-        # I assume laminar is more accurate when just above 2000 and CB more accurate when just below Re 4000.
-        # I will weight the mean appropriately using a linear interpolation.
-        mean = 64/2000+(Re - 2000) / (4000 - 2000) * CBff + (4000 - Re) / (4000 - 2000) * Lamff  # $JES MISSING CODE
-
-        # the variance in the ff should be maximum at Re=3000 and go to zero at Re=2000 or Re=4000
-        sig_1 = (1 - (Re - 3000) / 1000) * 0.2 * mean
-        sig_2 = (1 - (3000 - Re) / 1000) * 0.2 * mean
-        sig = sig_1 if Re >= 3000 else sig_2
-        # Now, use normalvariate to put some randomness in the choice
-        return rnd.normalvariate(mean, sig)
+        trans = (Re > 2000) & (Re < 4000)
+        if np.any(trans):
+            ReT = Re[trans]
+            # I assume laminar is more accurate when just above 2000 and CB more accurate when just below Re 4000.
+            # I will weight the mean appropriately using a linear interpolation.
+            mean = 64/2000+(ReT - 2000) / (4000 - 2000) * CBff[trans] + (4000 - ReT) / (4000 - 2000) * Lamff[trans]  # $JES MISSING CODE
+            # the variance in the ff should be maximum at Re=3000 and go to zero at Re=2000 or Re=4000
+            sig = np.where(ReT >= 3000, 1 - (ReT - 3000) / 1000, 1 - (3000 - ReT) / 1000) * 0.2 * mean
+            # Now, use a normal variate to put some randomness in the choice
+            ff[trans] = rng.normal(mean, sig)
+        return float(ff[0]) if scalar else ff
+
+    @staticmethod
+    def swameeJain(Re, rr):
+        """
+        Calculates the turbulent (Darcy) friction factor with the explicit Swamee-Jain approximation to the
+        Colebrook equation, f = 0.25/log10(rr/3.7 + 5.74/Re^0.9)^2, which agrees with Colebrook to within about 1%
+        without having to iterate.  Works for a float or a numpy array of Reynolds numbers.
+        :param Re: the Reynolds number
+        :param rr: the relative roughness
+        :return: the (Darcy) friction factor
+        """
+        lg = np.log10(rr / 3.7 + 5.74 / Re ** 0.9)
+        return 0.25 / (lg * lg)
+
+    @staticmethod
+    def colebrook(Re, rr, tol=1e-12, maxiter=50):
+        """
+        Solves the Colebrook equation for turbulent flow, 1/sqrt(f) = -2*log10(rr/3.7 + 2.51/(Re*sqrt(f))).
+        It is solved for x=1/sqrt(f) by Newton's method on g(x) = x + 2*log10(rr/3.7 + 2.51*x/Re).  Starting from
+        the Swamee-Jain estimate puts x within about 1% of the root, so it converges in two to four steps.  Works
+        for a float or a numpy array of Reynolds numbers.
+        :param Re: the Reynolds number
+        :param rr: the relative roughness
+        :return: the (Darcy) friction factor
+        """
+        a = rr / 3.7
+        b = 2.51 / Re
+        x = 1 / np.sqrt(Pipe.swameeJain(Re, rr))
+        for i in range(maxiter):
+            arg = a + b * x
+            dx = (x + 2.0 * np.log10(arg)) / (1 + 2.0 * b / (arg * math.log(10)))
+            x = x - dx
+            if np.max(np.abs(dx)) < tol:
+                break
+        return 1 / (x * x)
 
     def frictionHeadLoss(self, rho=1000):  # calculate headloss through a section of pipe in m of fluid
         '''
@@ -274,9 +314,9 @@ class Pipe():
         DeltaP=f*(L/d)*(rho*V^2)/2
         Note:  the headloss should always be a positive number.
         '''
-        g = 9.81  # m/s^2
-        ff = self.FrictionFactor()
-        self.hl = ff * (self.length / self.d) * (self.fluid.rho * self.V() ** 2) / (2 * g)# $JES MISSING CODE  # calculate the head loss in m of water
+        ff = self.FrictionFactor()  # also updates self.vel through Re()
+        v = self.vel
+        self.hl = ff * self.hlFactor * v * v  # calculate the head loss in m of water
         return self.hl
 
     def getFlowHeadLoss(self, s):
@@ -303,16 +343,21 @@ class Pipe():
         return self.startNode == node or self.endNode == node
 
     def printPipeFlowRate(self, SI=True):
+        print(self.flowRateString(SI=SI))
 
+    def flowRateString(self, SI=True):
         q_units = 'L/s' if SI else 'cfs'
         q = self.Q if SI else self.Q * UC.L_to_ft3
-        print('The flow in segment {} is {:0.2f} ({}) and Re={:.1f}'.format(self.Name(), q, q_units, self.reynolds))
+        return 'The flow in segment {} is {:0.2f} ({}) and Re={:.1f}'.format(self.Name(), q, q_units, self.reynolds)
 
     def printPipeHeadLoss(self, SI=True):
+        print(self.headLossString(SI=SI))
+
+    def headLossString(self, SI=True):
         """
-        Print properties of pipe and head loss
-        :param SI: if True, prints in mm of fluid, if False prints inches of fluid
-        :return:
+        Format properties of pipe and head loss
+        :param SI: if True, reports in mm of fluid, if False reports inches of fluid
+        :return: the report line as a string
         """
         cfd = 1000 if SI else UC.m_to_in  # conversion factor for diameter
         unitsd = 'mm' if SI else 'in'  # units for diameter
@@ -320,10 +365,10 @@ class Pipe():
         unitsL = 'm' if SI else 'in'  # units for length
         cfh = cfd
         units_h = unitsd
-        print("head loss in pipe {} (L={:.2f} {}, d={:.2f} {}) is {:.2f} {} of water".format(self.Name(),
-                                                                                             self.length * cfL, unitsL,
-                                                                                             self.d * cfd, unitsd,
-                                                                                             self.hl * cfh, units_h))
+        return "head loss in pipe {} (L={:.2f} {}, d={:.2f} {}) is {:.2f} {} of water".format(self.Name(),
+                                                                                              self.length * cfL, unitsL,
+                                                                                              self.d * cfd, unitsd,
+                                                                                              self.hl * cfh, units_h)
 
     def getFlowIntoNode(self, n):
         '''
@@ -337,18 +382,49 @@ class Pipe():
 
 
 class PipeNetwork():
-    def __init__(self, Pipes=[], Loops=[], Nodes=[], fluid=Fluid()):
+    def __init__(self, Pipes=[], Loops=[], Nodes=[], fluid=Fluid(), rng=None):
         '''
         The pipe network is built from pipe, node, loop, and fluid objects.
         :param Pipes: a list of pipe objects
         :param Loops: a list of loop objects
         :param Nodes: a list of node objects
         :param fluid: a fluid object
+        :param rng: a numpy random Generator for friction factors in transitional flow (a new one if None).
+            Pass the same generator to the pipes to reproduce a run from a single seed.
         '''
         self.loops = Loops
         self.nodes = Nodes
         self.Fluid = fluid
         self.pipes = Pipes
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def getArrays(self):
+        '''
+        Packs the pipe, node and loop data into parallel numpy arrays (one entry per pipe) so the equations
+        for fsolve can be evaluated with vector operations instead of visiting every pipe object.  The arrays
+        are built fresh from the current pipes, nodes and loops on every call and are not stored on the network.
+        :return: a dict of the arrays
+        '''
+        nodeNames = [n.name for n in self.nodes]
+        # one row per node: -1 for pipes starting at the node (flow out), +1 for pipes ending there (flow in)
+        nodeSigns = np.zeros((len(self.nodes), len(self.pipes)))
+        for j, p in enumerate(self.pipes):
+            nodeSigns[nodeNames.index(p.startNode), j] = -1
+            nodeSigns[nodeNames.index(p.endNode), j] = 1
+        # one row per loop: +1/-1 if the loop traverses a pipe with/against its direction, 0 if not in the loop
+        loopSigns = np.zeros((len(self.loops), len(self.pipes)))
+        for i, l in enumerate(self.loops):
+            startNode = l.pipes[0].startNode
+            for p in l.pipes:
+                loopSigns[i, self.pipes.index(p)] = 1.0 if startNode == p.startNode else -1.0
+                startNode = p.endNode if startNode != p.endNode else p.startNode
+        return {'relrough': np.array([p.relrough for p in self.pipes]),
+                'velFactor': np.array([p.velFactor for p in self.pipes]),
+                'reFactor': np.array([p.reFactor for p in self.pipes]),
+                'hlFactor': np.array([p.hlFactor for p in self.pipes]),
+                'extFlow': np.array([n.extFlow for n in self.nodes], dtype=float),
+                'nodeSigns': nodeSigns,
+                'loopSigns': loopSigns}
 
     def findFlowRates(self):
         '''
@@ -358,9 +434,14 @@ class PipeNetwork():
         '''
         # see how many nodes and loops there are, this is how many equation results I will return
         N = len(self.nodes) + len(self.loops)
+        nPipes = len(self.pipes)
         # build an initial guess for flow rates in the pipes.
         # note that I only have 10 pipes, but need 11 variables because of the degenerate node equation at b.
         Q0 = np.full(N, 10)
+        # snapshot the network as arrays for the duration of this solve
+        arr = self.getArrays()
+        relrough, velFactor, reFactor, hlFactor = arr['relrough'], arr['velFactor'], arr['reFactor'], arr['hlFactor']
+        extFlow, nodeSigns, loopSigns = arr['extFlow'], arr['nodeSigns'], arr['loopSigns']
 
         def fn(q):
             """
@@ -370,25 +451,26 @@ class PipeNetwork():
             :param q: an array of flowrates in the pipes + 1 extra value b/c of node b
             :return: L an array containing flow rates at the nodes and  pressure losses for the loops
             """
-            # Set all the nodes to 0 pressure and uncalculated
-            for n in self.nodes:
-                n.P = 0
-                n.oCalculated = False
-            # update the flow rate in each pipe object
-            for i in range(len(self.pipes)):
-                self.pipes[i].Q = q[i]  # set volumetric flow rate from input argument q
-            # calculate the net flow rate for the node objects
+            Q = q[:nPipes]
+            # calculate the net flow rate into each node: pipe flow leaves the start node and enters the end node
             # note:  when flow rates in pipes are correct, the net flow into each node should be zero.
-            L = self.getNodeFlowRates()
-            # L = #$JES MISSING CODE  # call the getNodeFlowRates function of this class
-            # calculate the net head loss for the loop objects
+            qNet = extFlow + nodeSigns @ Q
+            # calculate the signed head loss in each pipe (positive in the direction of the pipe)
+            V = np.abs(Q * velFactor)
+            hl = Pipe.frictionFactors(V * reFactor, relrough, self.rng) * hlFactor * V * V
+            shl = np.where(Q >= 0, hl, -hl)
+            # calculate the net head loss for each loop
             # note: when the flow rates in pipes are correct, the net head loss for each loop should be zero.
-            L += self.getLoopHeadLosses()
-            # L += #$JES MISSING CODE  # call the getLoopHeadLosses function of this class
-            return L
+            lhl = loopSigns @ shl
+            return np.concatenate((qNet, lhl))
 
         # using fsolve to find the flow rates
         FR = fsolve(fn, Q0)
+        # store the solution back on the pipe and node objects for reporting
+        for i, p in enumerate(self.pipes):
+            p.Q = FR[i]
+            p.frictionHeadLoss()
+        self.getNodeFlowRates()
         return FR
 
     def getNodeFlowRates(self):
@@ -473,41 +555,54 @@ class PipeNetwork():
                 self.nodes.append(Node(p.endNode, self.getNodePipes(p.endNode)))
 
     def printPipeFlowRates(self, SI=True):
-        for p in self.pipes:
-            p.printPipeFlowRate(SI=SI)
+        # build the whole report and write it to stdout once rather than printing line by line
+        sys.stdout.write('\n'.join(p.flowRateString(SI=SI) for p in self.pipes) + '\n')
 
     def printNetNodeFlows(self, SI=True):
-        for n in self.nodes:
-            Q = n.QNet if SI else n.QNet * UC.L_to_ft3
-            units = 'L/S' if SI else 'cfs'
-            print('net flow into node {} is {:0.2f} ({})'.format(n.name, Q, units))
+        cf = 1.0 if SI else UC.L_to_ft3
+        units = 'L/S' if SI else 'cfs'
+        sys.stdout.write('\n'.join('net flow into node {} is {:0.2f} ({})'.format(n.name, n.QNet * cf, units)
+                                   for n in self.nodes) + '\n')
 
     def printLoopHeadLoss(self, SI=True):
-        cf = UC.m_to_psi(1, self.pipes[0].fluid.rho)
+        cf = 1.0 if SI else UC.m_to_psi(1, self.pipes[0].fluid.rho)
         units = 'm of water' if SI else 'psi'
-        for l in self.loops:
-            hl = l.getLoopHeadLoss()
-            hl = hl if SI else hl * cf
-            print('head loss for loop {} is {:0.2f} ({})'.format(l.name, hl, units))
+        sys.stdout.write('\n'.join('head loss for loop {} is {:0.2f} ({})'.format(l.name, hl * cf, units)
+                                   for l, hl in zip(self.loops, self.getLoopHeadLosses())) + '\n')
 
     def printPipeHeadLoss(self, SI=True):
-        cf = UC.m_to_in
-        for p in self.pipes:
-            p.printPipeHeadLoss(SI=SI)
-            #hl = p.HeadLoss()
-            #hl = hl if SI else hl * cf
-            #l = p.length if SI else p.length / UC.ft_to_m
-            #d = p.diam if SI else p.diam / UC.in_to_m
-            #p_units = 'm of water' if SI else 'in of water'
-            #print('head loss in pipe {} (L={:0.2f}, d={:0.3f}) is {:0.2f} {}'.format(p.Name(), l, d, hl, p_units))
+        sys.stdout.write('\n'.join(p.headLossString(SI=SI) for p in self.pipes) + '\n')
 
     def printNodePressures(self, SI=True):
         pUnits = 'm of water' if SI else 'psi'
         cf = 1.0 if SI else UC.m_to_psi(1, self.Fluid.rho)
-        for n in self.nodes:
-            p = n.P * cf
-            print('Pressure at node {} = {:0.2f} {}'.format(n.name, p, pUnits))
+        sys.stdout.write('\n'.join('Pressure at node {} = {:0.2f} {}'.format(n.name, n.P * cf, pUnits)
+                                   for n in self.nodes) + '\n')
+
+
+# endregion
 
+# region constants
+# note:  these are surface roughness in ft.  We must calculate relative roughness for each pipe later
+r_CI = 0.00085  # ft roughness for cast iron
+r_CN = 0.003  # ft roughness for concrete
+
+# the pipes of the network as (start node, end node, length (ft), diameter (in), roughness (ft))
+PIPE_DATA = (
+    ('a', 'b', 1000, 18, r_CN),
+    ('a', 'h', 1600, 18, r_CN),
+    ('b', 'c', 500, 18, r_CN),
+    ('b', 'e', 800, 16, r_CI),
+    ('c', 'd', 500, 18, r_CN),
+    ('c', 'f', 800, 16, r_CI),
+    ('d', 'g', 800, 16, r_CI),
+    ('e', 'f', 500, 12, r_CI),
+    ('e', 'i', 800, 18, r_CN),
+    ('f', 'g', 500, 12, r_CI),
+    ('g', 'j', 800, 18, r_CN),
+    ('h', 'i', 1000, 24, r_CN),
+    ('i', 'j', 1000, 24, r_CN),
+)
 
 # endregion
 
@@ -532,28 +627,15 @@ def main():
     SIUnits = False
     water = Fluid(mu=20.5E-6, rho=62.3,SI=SIUnits)  # $JES MISSING CODE  # instantiate a fluid object
 
-    # note:  these are surface roughness in ft.  We must calculate relative roughness for each pipe later
-    r_CI = 0.00085  # ft roughness for cast iron
-    r_CN = 0.003  # ft roughness for concrete
+    # one random generator for the whole network, e.g. np.random.default_rng(seed) to reproduce a run
+    rng = np.random.default_rng()
 
     # instantiate a new PipeNetwork object
-    PN = PipeNetwork()
+    PN = PipeNetwork(rng=rng)
     PN.Fluid = water
     # add Pipe objects to the pipe network (see constructor for Pipe class)
-    PN.pipes.append(Pipe('a', 'b', 1000, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('a', 'h', 1600, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('b', 'c', 500, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('b', 'e', 800, 16, r_CI, water, SI=SIUnits))
-    PN.pipes.append(Pipe('c', 'd', 500, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('c', 'f', 800, 16, r_CI, water, SI=SIUnits))
-    PN.pipes.append(Pipe('d', 'g', 800, 16, r_CI, water, SI=SIUnits))
-    PN.pipes.append(Pipe('e', 'f', 500, 12, r_CI, water, SI=SIUnits))
-    PN.pipes.append(Pipe('e', 'i', 800, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('f', 'g', 500, 12, r_CI, water, SI=SIUnits))
-    PN.pipes.append(Pipe('g', 'j', 800, 18, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('h', 'i', 1000, 24, r_CN, water, SI=SIUnits))
-    PN.pipes.append(Pipe('i', 'j', 1000, 24, r_CN, water, SI=SIUnits))
-    # JES MISSING CODE  # Add all the necessary pipes to the network
+    for start, end, length, diam, rough in PIPE_DATA:
+        PN.pipes.append(Pipe(start, end, length, diam, rough, water, SI=SIUnits, rng=rng))
 
     # add Node objects to the pipe network by calling buildNodes method of PN object
     PN.buildNodes()